@@ -0,0 +1,272 @@
+"""
+Chapter / sub-chapter / section structure of an act.
+
+The act page lists the chapter headings (the 'col-sm-4' div) and all sections
+in order (myTableActSection), but not which sections belong to which heading.
+indiacode loads that per heading from /ChapterIndexWiseSection. Those pages are
+cached in <act>/chapters/, and the sections of each heading become a range of
+positions in the act's section order.
+
+The structure is persisted as <web_number>_structure.json and supports:
+  - locate('43A'): the chapter and sub-chapter of a section, by bisecting the
+    sorted heading ranges, O(log n).
+  - prev_section / next_section navigation.
+  - section_range('3', '7A') and chapter_sections('CHAPTER IV') slicing.
+"""
+
+import re
+from bisect import bisect_right
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import urlparse, parse_qs, urlencode
+
+from pydantic import BaseModel, PrivateAttr
+
+ChapterIndexURL = 'https://www.indiacode.nic.in/ChapterIndexWiseSection'
+SectionNumberRegex = re.compile(r'^\s*(?:section|sec\.)\s*', re.IGNORECASE)
+
+
+def get_section_key(number):
+    """'Section 43A.' -> '43A', so a section can be looked up by the number people use."""
+    return SectionNumberRegex.sub('', number).strip().rstrip('.').strip().upper()
+
+
+class StructureNode(BaseModel):
+    number: Optional[str] = None
+    title: Optional[str] = None
+    heading_id: Optional[str] = None
+    heading_class: Optional[str] = None
+    start: Optional[int] = None  # range of positions in ActStructure.section_web_numbers
+    end: Optional[int] = None
+    children: List['StructureNode'] = []
+
+    def leaves(self):
+        return self.children if self.children else [self]
+
+
+class ActStructure(BaseModel):
+    web_number: str
+    section_web_numbers: List[str]
+    section_numbers: List[str]
+    chapters: List[StructureNode]
+
+    _leaf_starts: Optional[list] = PrivateAttr(default=None)
+    _leaves: Optional[list] = PrivateAttr(default=None)
+    _positions: Optional[dict] = PrivateAttr(default=None)
+
+    def _build_lookups(self):
+        leaves = [
+            (leaf.start, leaf.end, chapter, leaf if leaf is not chapter else None)
+            for chapter in self.chapters for leaf in chapter.leaves() if leaf.start is not None
+        ]
+        leaves.sort(key=lambda item: item[0])
+        self._leaves = leaves
+        self._leaf_starts = [item[0] for item in leaves]
+        self._positions = {}
+        for pos, (web_number, number) in enumerate(zip(self.section_web_numbers, self.section_numbers)):
+            self._positions.setdefault(web_number, pos)
+            self._positions.setdefault(get_section_key(number), pos)
+
+    def get_position(self, section):
+        """Position of a section given its number ('43A', 'Section 43A.') or its web number."""
+        if self._positions is None:
+            self._build_lookups()
+        pos = self._positions.get(section)
+        if pos is None:
+            pos = self._positions.get(get_section_key(section))
+        if pos is None:
+            raise KeyError(f'Unknown section {section} in act {self.web_number}')
+        return pos
+
+    def locate(self, section):
+        """Return (chapter, sub_chapter) containing the section, (None, None) if it is not under any heading."""
+        pos = self.get_position(section)
+        idx = bisect_right(self._leaf_starts, pos) - 1
+        if idx >= 0:
+            start, end, chapter, sub_chapter = self._leaves[idx]
+            if start <= pos < end:
+                return chapter, sub_chapter
+        return None, None
+
+    def _section_at(self, pos):
+        if 0 <= pos < len(self.section_web_numbers):
+            return self.section_web_numbers[pos], self.section_numbers[pos]
+        return None
+
+    def prev_section(self, section):
+        """(web_number, number) of the previous section, None for the first one."""
+        return self._section_at(self.get_position(section) - 1)
+
+    def next_section(self, section):
+        """(web_number, number) of the next section, None for the last one."""
+        return self._section_at(self.get_position(section) + 1)
+
+    def section_range(self, first, last):
+        """Sections from `first` to `last`, both inclusive, as (web_number, number) pairs."""
+        start, end = self.get_position(first), self.get_position(last) + 1
+        return list(zip(self.section_web_numbers[start:end], self.section_numbers[start:end]))
+
+    def chapter_sections(self, chapter_number):
+        for chapter in self.chapters:
+            if chapter.number == chapter_number and chapter.start is not None:
+                return list(zip(
+                    self.section_web_numbers[chapter.start:chapter.end],
+                    self.section_numbers[chapter.start:chapter.end],
+                ))
+        return []
+
+
+HeadingClasses = ('headingone', 'headingtwo', 'headingthree', 'headingfour')
+SubHeadingXPath = './/a[@class="headingtwo" or @class="headingthree" or @class="headingfour"]'
+
+
+def parse_headings(tree):
+    """Chapter nodes from the act page, with a child per heading when a chapter has several.
+
+    Chapters are <li> items numbered by a <b> or by a 'headingone' anchor, or bare
+    'headingone' anchors directly in the chapter list. Every heading anchor has its
+    own /ChapterIndexWiseSection page, a chapter without sub-headings is fetched
+    through its headingone anchor. This is the only chapter parser: parse_act()
+    builds its ChapterInfo list from these nodes.
+    """
+    col_divs = tree.xpath('//div[contains(@class, "col-sm-4")]')
+    chapter_elems = col_divs[0].xpath('./li | ./a[@class="headingone"]') if col_divs else []
+
+    chapters = []
+    for elem in chapter_elems:
+        li = elem if elem.tag == 'li' else None
+        heading_ones = li.xpath('./a[@class="headingone"]') if li is not None else [elem]
+        heading_one = heading_ones[0] if heading_ones else None
+
+        number_text = li.xpath('./b/text()') if li is not None else []
+        if not (number_text and number_text[0].strip()) and heading_one is not None:
+            number_text = [''.join(heading_one.xpath('./b//text()'))]
+        number = number_text[0].strip() if number_text else None
+        if not number:
+            continue
+
+        headings = [
+            StructureNode(title=(a.text or '').strip(), heading_id=a.get('id'), heading_class=a.get('class'))
+            for a in (li.xpath(SubHeadingXPath) if li is not None else [])
+        ]
+        if not headings and heading_one is not None:
+            chapters.append(StructureNode(number=number, heading_id=heading_one.get('id'), heading_class='headingone'))
+        elif len(headings) == 1 and headings[0].heading_class == 'headingtwo':
+            chapters.append(headings[0].model_copy(update={'number': number}))
+        else:
+            title_text = li.xpath('./ul/li/text()')
+            title = title_text[0].strip() if title_text and title_text[0].strip() else None
+            chapters.append(StructureNode(number=number, title=title, children=headings))
+    return chapters
+
+
+def split_heading_id(heading: StructureNode):
+    """(act_id, heading ids, org_act_id) of a heading anchor id, 'act#h1[#h2[#h3[#h4]]][#org]'.
+
+    The number of heading ids follows the anchor class (headingone: 1 ... headingfour: 4).
+    Some ids lack the org act id, the page's JS then sends 'undefined', and so do we.
+    """
+    num_ids = HeadingClasses.index(heading.heading_class) + 1
+    parts = heading.heading_id.split('#')
+    org_act_id = parts[num_ids + 1] if len(parts) > num_ids + 1 else 'undefined'
+    return parts[0], parts[1:num_ids + 1], org_act_id
+
+
+def get_chapter_page_name(heading: StructureNode):
+    """File name of a cached /ChapterIndexWiseSection page, from the heading's h1/h2[/h3] ids."""
+    _, heading_ids, _ = split_heading_id(heading)
+    return '_'.join(heading_ids) + '.html'
+
+
+def get_chapter_url(act_details, heading: StructureNode):
+    """The /ChapterIndexWiseSection url the act page requests when a heading is clicked."""
+    act_id, heading_ids, org_act_id = split_heading_id(heading)
+    section_query = parse_qs(urlparse(act_details.sections[0].url).query)
+    # as in the page's JS, the ids below the heading's level repeat h1id
+    h1id, h2id, h3id, h4id = heading_ids + [heading_ids[0]] * (4 - len(heading_ids))
+    query = {
+        'abv': section_query['abv'][0],
+        'statehandle': section_query['statehandle'][0],
+        'actid': act_id,
+        'h1id': h1id,
+        'h2id': h2id,
+        'h3id': h3id,
+        'h4id': h4id,
+        'orgactid': org_act_id,
+        'headingno': heading.heading_class,
+    }
+    return f'{ChapterIndexURL}?{urlencode(query)}'
+
+
+def get_heading_label(chapter: StructureNode, heading: StructureNode):
+    """'CHAPTER IV Of Appeals' for log lines, headingone chapters have no separate title."""
+    return f'{chapter.number} {heading.title}' if heading.title else chapter.number
+
+
+def list_chapter_pages(act_dir: Path, tree=None):
+    """(chapter, heading, cached page path) of every heading that has a /ChapterIndexWiseSection page."""
+    if tree is None:
+        from lxml import etree
+        tree = etree.fromstring((act_dir / f'{act_dir.name}.html').read_text(), etree.HTMLParser())
+    return [
+        (chapter, heading, act_dir / 'chapters' / get_chapter_page_name(heading))
+        for chapter in parse_headings(tree) for heading in chapter.leaves() if heading.heading_id
+    ]
+
+
+def parse_chapter_page(html_str):
+    """Section web numbers listed on a /ChapterIndexWiseSection page, in order."""
+    from lxml import etree
+
+    tree = etree.fromstring(html_str, etree.HTMLParser())
+    if tree is None:
+        return []
+    web_numbers = []
+    for href in tree.xpath('//a[contains(@href, "sectionId=")]/@href'):
+        section_ids = parse_qs(urlparse(href).query).get('sectionId')
+        if section_ids and section_ids[0] not in web_numbers:
+            web_numbers.append(section_ids[0])
+    return web_numbers
+
+
+def build_act_structure(act_details, tree, act_dir: Path):
+    """Build the structure from the act page and the cached chapter pages, and fill ChapterInfo.sections."""
+    section_web_numbers = [s.web_number for s in act_details.sections]
+    section_numbers = [s.number for s in act_details.sections]
+    positions = {web_number: pos for pos, web_number in enumerate(section_web_numbers)}
+    chapters = parse_headings(tree)
+
+    for chapter in chapters:
+        for leaf in chapter.leaves():
+            page_path = act_dir / 'chapters' / get_chapter_page_name(leaf) if leaf.heading_id else None
+            if page_path is None or not page_path.exists():
+                continue
+            leaf_positions = [positions[w] for w in parse_chapter_page(page_path.read_text()) if w in positions]
+            if leaf_positions:
+                leaf.start, leaf.end = min(leaf_positions), max(leaf_positions) + 1
+        ranges = [(leaf.start, leaf.end) for leaf in chapter.leaves() if leaf.start is not None]
+        if ranges:
+            chapter.start, chapter.end = min(r[0] for r in ranges), max(r[1] for r in ranges)
+
+    structure = ActStructure(
+        web_number=act_details.web_number,
+        section_web_numbers=section_web_numbers,
+        section_numbers=section_numbers,
+        chapters=chapters,
+    )
+
+    # parse_act() builds one ChapterInfo per parse_headings() node, in the same order
+    for chapter_info, node in zip(act_details.chapters, chapters):
+        if node.start is not None:
+            chapter_info.sections = [
+                [section_web_numbers[pos], section_numbers[pos]] for pos in range(node.start, node.end)
+            ]
+    return structure
+
+
+def get_structure_path(act_dir: Path):
+    return act_dir / f'{act_dir.name}_structure.json'
+
+
+def load_act_structure(act_dir: Path):
+    return ActStructure.model_validate_json(get_structure_path(act_dir).read_text())
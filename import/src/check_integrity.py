@@ -0,0 +1,158 @@
+"""
+Scan the cached corpus for truncated or bad artifacts and write a repair list.
+
+Checks, run over a process pool:
+  - PDFs start with '%PDF-' and have a '%%EOF' trailer near the end.
+  - Act HTML is non-empty, contains the 'myTableActSection' table and is not the
+    'URL is inaccessible' error page.
+  - Chapter pages list the sections of their heading.
+  - Section and notification fragments contain the section JSON, either raw or
+    wrapped in the browser's <pre> viewer.
+  - JSON files parse.
+  - No temp files are left over from an interrupted atomic write.
+
+The repair list is a JSON list of {state, act_web_number, path, reason}. It can be
+passed straight to the crawler, which deletes the listed files and re-fetches
+only those acts:
+
+    python import/src/check_integrity.py import/repair_list.json Maharashtra
+    python import/src/fetch_acts.py import/website/Maharashtra/act_infos.json import/repair_list.json
+
+Usage: python check_integrity.py [repair_list.json] [State ...]
+"""
+
+import json
+import os
+import sys
+from multiprocessing import Pool
+from pathlib import Path
+
+from corpus import WebsiteDir, PdfHeader, PdfTrailer, TmpSuffix, iter_state_dirs
+from normalize_html import get_act_error, get_chapter_error, get_section_error
+
+RepairListPath = Path("import/repair_list.json")
+TrailerWindow = 2048
+
+
+def check_pdf(path: Path):
+    size = path.stat().st_size
+    if size == 0:
+        return 'empty file'
+    with open(path, 'rb') as f:
+        if not f.read(len(PdfHeader)).startswith(PdfHeader):
+            return 'missing %PDF header'
+        f.seek(max(0, size - TrailerWindow))
+        if PdfTrailer not in f.read():
+            return 'missing %%EOF trailer'
+    return None
+
+
+def check_act_html(path: Path):
+    return get_act_error(path.read_text(errors='replace'))
+
+
+def check_chapter_html(path: Path):
+    return get_chapter_error(path.read_text(errors='replace'))
+
+
+def check_section_html(path: Path):
+    return get_section_error(path.read_text(errors='replace'))
+
+
+def check_json(path: Path):
+    try:
+        json.loads(path.read_text())
+    except ValueError as e:
+        return f'invalid json: {e}'
+    return None
+
+
+def check_file(path_str):
+    """Check a single cached artifact, returns a reason string if it needs repair."""
+    path = Path(path_str)
+    try:
+        if path.name.endswith(TmpSuffix):
+            return path_str, 'leftover temp file'
+        if path.suffix == '.pdf':
+            return path_str, check_pdf(path)
+        if path.suffix == '.json':
+            return path_str, check_json(path)
+        if path.suffix == '.html':
+            if path.parent.name == 'sections':
+                return path_str, check_section_html(path)
+            if path.parent.name == 'chapters':
+                return path_str, check_chapter_html(path)
+            return path_str, check_act_html(path)
+    except OSError as e:
+        return path_str, f'unreadable: {e}'
+    return path_str, None
+
+
+def list_artifacts(state_dir: Path):
+    """Yield the cached artifacts of a state (act HTML/JSON, sections, PDFs), skipping the listing pages."""
+    yield state_dir / 'act_infos.json'
+    for act_dir in state_dir.iterdir():
+        if not act_dir.is_dir():
+            continue
+        for root, _, file_names in os.walk(act_dir):
+            for file_name in file_names:
+                yield Path(root) / file_name
+
+
+def get_repair_entry(state_dir: Path, path: Path, reason):
+    rel_parts = path.relative_to(state_dir).parts
+    act_web_number = rel_parts[0] if len(rel_parts) > 1 else None
+    return {'state': state_dir.name, 'act_web_number': act_web_number, 'path': str(path), 'reason': reason}
+
+
+def scan(website_dir: Path = WebsiteDir, states=None, processes=None):
+    """Check every cached artifact in parallel, returns the repair list entries."""
+    path_states = {}
+    for state_dir in iter_state_dirs(website_dir, states):
+        for path in list_artifacts(state_dir):
+            path_states[str(path)] = state_dir
+
+    print(f'Checking {len(path_states)} files')
+    repair_list = []
+    with Pool(processes) as pool:
+        for path_str, reason in pool.imap_unordered(check_file, path_states, chunksize=256):
+            if reason:
+                repair_list.append(get_repair_entry(path_states[path_str], Path(path_str), reason))
+
+    repair_list.sort(key=lambda e: e['path'])
+    return repair_list
+
+
+def apply_repair_list(repair_list_path: Path, state_dir: Path):
+    """Delete the bad files of `state_dir` listed in the repair list so they are re-fetched.
+
+    Returns:
+        set: act web numbers that need to be re-crawled.
+    """
+    repair_list = json.loads(Path(repair_list_path).read_text())
+    act_web_numbers = set()
+    for entry in repair_list:
+        if entry['state'] != state_dir.name or entry['act_web_number'] is None:
+            continue
+        path = Path(entry['path'])
+        if path.exists():
+            print(f'Removing {path}: {entry["reason"]}')
+            path.unlink()
+        act_web_numbers.add(entry['act_web_number'])
+    return act_web_numbers
+
+
+def main():
+    repair_list_path = Path(sys.argv[1]) if len(sys.argv) > 1 else RepairListPath
+    states = sys.argv[2:]
+
+    repair_list = scan(WebsiteDir, states)
+    for entry in repair_list:
+        print(f'{entry["path"]}: {entry["reason"]}')
+
+    repair_list_path.write_text(json.dumps(repair_list, indent=2))
+    print(f'{len(repair_list)} files need repair, written to {repair_list_path}')
+
+
+if __name__ == '__main__':
+    main()
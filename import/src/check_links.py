@@ -0,0 +1,230 @@
+"""
+Check every PDF link published in README.md (citation and 'Other PDFs' links).
+
+Links are checked concurrently with HEAD requests over a pooled session, with a
+cap on the number of requests in flight per host. Redirects are followed and a
+link is classified by where it ends up: it is OK only if that is a PDF. indiacode
+serves its throttling page with a 200, so a non-PDF response is re-checked with
+a GET and a throttled link is re-checked on the next run. Other results are
+cached with a TTL (shorter for broken links) so re-runs only check what is
+stale. For broken bitstream links the other bitstream sequence numbers (/1/,
+/2/, ...) are probed, since indiacode moves files between them.
+
+The report lists broken, throttled and redirected links with the act they
+belong to. A redirect that only upgrades the scheme or host (http://indiacode.nic.in
+to https://www.indiacode.nic.in, which nearly every published link does) is OK;
+only redirects to another path are reported.
+
+Usage: python check_links.py [report.json] [State ...]
+"""
+
+import json
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+from corpus import WebsiteDir, InaccessibleMarker, PdfHeader, get_act_web_number, iter_state_dirs, load_act_infos
+from corpus import write_text_atomic
+
+LinkCachePath = Path("import/link_cache.json")
+LinkReportPath = Path("import/link_report.json")
+
+OkTTL = 7 * 24 * 3600
+BrokenTTL = 24 * 3600
+NumWorkers = 32
+PerHostLimit = 8
+Timeout = 30
+MaxBitstreamSequence = 9
+SniffSize = 4096
+InaccessibleError = 'inaccessible error page'
+
+BitstreamRegex = re.compile(r'(/bitstream/\d+/\d+/)(\d+)(/)')
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15',
+    'Accept-Language': 'en-IN,en-GB;q=0.9,en;q=0.8',
+}
+
+
+def get_published_links(states=None):
+    """Return {url: [link info]} for the links README.md publishes, as generate_readme.py builds them."""
+    links = defaultdict(list)
+    for state_dir in iter_state_dirs(WebsiteDir, states):
+        for act_info in load_act_infos(state_dir):
+            act_web_number = get_act_web_number(act_info['View'])
+            act_json_path = state_dir / act_web_number / f'{act_web_number}.json'
+            if not act_json_path.exists():
+                continue
+            act_json = json.loads(act_json_path.read_text())
+            published = [('citation', url) for url in act_json.get('citation_pdf_urls', [])[:1]]
+            published += [('other', url) for url in act_json.get('pdf_urls', [])]
+            for kind, raw_url in published:
+                url = raw_url.replace('nic.in ', 'nic.in')
+                links[url].append({
+                    'state': state_dir.name, 'act_web_number': act_web_number, 'kind': kind,
+                    'malformed': raw_url != url,
+                })
+    return links
+
+
+class LinkChecker:
+    def __init__(self, num_workers=NumWorkers, per_host_limit=PerHostLimit):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=num_workers, pool_maxsize=num_workers, max_retries=1)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.num_workers = num_workers
+        self.per_host_limit = per_host_limit
+        self.host_semaphores = defaultdict(lambda: threading.BoundedSemaphore(self.per_host_limit))
+        self.lock = threading.Lock()
+
+    def _host_semaphore(self, url):
+        with self.lock:
+            return self.host_semaphores[get_host(url)]
+
+    def head(self, url):
+        """HEAD a url following redirects, returns (response, first bytes of the body).
+
+        Falls back to a GET, reading only the first bytes, when HEAD is not allowed or
+        does not answer with a PDF, so that error pages served with a 200 can be told apart.
+        """
+        with self._host_semaphore(url):
+            response = self.session.head(url, allow_redirects=True, timeout=Timeout)
+            if response.status_code not in (403, 405, 501) and (response.status_code >= 400 or is_pdf_response(response)):
+                return response, b''
+            response = self.session.get(url, allow_redirects=True, timeout=Timeout, stream=True)
+            try:
+                body = next(response.iter_content(SniffSize), b'')
+            finally:
+                response.close()
+        return response, body
+
+    def check(self, url):
+        result = {'url': url, 'checked_at': time.time()}
+        try:
+            response, body = self.head(url)
+            result['status'] = response.status_code
+            if response.history:
+                result['location'] = response.url
+            result['error'] = get_link_error(response, body)
+        except Exception as e:
+            result['status'] = None
+            result['error'] = str(e)
+
+        if result['error'] == InaccessibleError:
+            result['throttled'] = True
+        elif is_broken(result):
+            moved_url = self.find_moved_bitstream(url)
+            if moved_url:
+                result['moved_to'] = moved_url
+        return result
+
+    def find_moved_bitstream(self, url):
+        """Probe the other bitstream sequence numbers of a broken indiacode link."""
+        m = BitstreamRegex.search(url)
+        if not m:
+            return None
+        for sequence in range(1, MaxBitstreamSequence + 1):
+            if str(sequence) == m.group(2):
+                continue
+            candidate = url[:m.start()] + f'{m.group(1)}{sequence}{m.group(3)}' + url[m.end():]
+            try:
+                if get_link_error(*self.head(candidate)) is None:
+                    return candidate
+            except Exception:
+                continue
+        return None
+
+    def check_all(self, urls):
+        with ThreadPoolExecutor(self.num_workers) as executor:
+            yield from executor.map(self.check, urls)
+
+
+def is_pdf_response(response):
+    return 'application/pdf' in response.headers.get('Content-Type', '').lower()
+
+
+def get_link_error(response, body):
+    """Why a (redirect-followed) response is not the PDF, None if it is."""
+    if response.status_code >= 400:
+        return f'HTTP {response.status_code}'
+    if InaccessibleMarker.encode() in body:
+        return InaccessibleError
+    if is_pdf_response(response) or body.startswith(PdfHeader):
+        return None
+    return f'not a PDF ({response.headers.get("Content-Type")})'
+
+
+def get_host(url):
+    """Host a request counts against, 'www.indiacode.nic.in' and 'indiacode.nic.in' are the same server."""
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def is_redirected(result):
+    """True if the link ends up at another path, not just on the https or www. host."""
+    location = result.get('location')
+    if not location:
+        return False
+    url, final_url = urlparse(result['url']), urlparse(location)
+    return (url.path, url.query) != (final_url.path, final_url.query)
+
+
+def is_broken(result):
+    return result['status'] is None or result['status'] >= 400 or bool(result.get('error'))
+
+
+def is_fresh(result, now):
+    # throttled checks say nothing about the link, and 3xx results predate following redirects
+    if result.get('throttled') or 300 <= (result['status'] or 0) < 400:
+        return False
+    ttl = BrokenTTL if is_broken(result) else OkTTL
+    return now - result['checked_at'] < ttl
+
+
+def main():
+    report_path = Path(sys.argv[1]) if len(sys.argv) > 1 else LinkReportPath
+    states = sys.argv[2:]
+
+    links = get_published_links(states)
+    cache = json.loads(LinkCachePath.read_text()) if LinkCachePath.exists() else {}
+    now = time.time()
+    stale_urls = [url for url in links if url not in cache or not is_fresh(cache[url], now)]
+    print(f'{len(links)} published links, {len(stale_urls)} to check')
+
+    start = time.time()
+    checker = LinkChecker()
+    for idx, result in enumerate(checker.check_all(stale_urls), 1):
+        cache[result['url']] = result
+        if idx % 500 == 0:
+            print(f'\t[{idx}/{len(stale_urls)}] {time.time() - start:.0f}s')
+            write_text_atomic(LinkCachePath, json.dumps(cache))
+    write_text_atomic(LinkCachePath, json.dumps(cache))
+
+    report = {'broken': [], 'throttled': [], 'redirected': [], 'malformed': []}
+    for url, link_infos in sorted(links.items()):
+        result = cache[url]
+        entry = dict(result, acts=link_infos)
+        if result.get('throttled'):
+            report['throttled'].append(entry)
+        elif is_broken(result):
+            report['broken'].append(entry)
+        elif is_redirected(result):
+            report['redirected'].append(entry)
+        if any(info['malformed'] for info in link_infos):
+            report['malformed'].append(entry)
+
+    write_text_atomic(report_path, json.dumps(report, indent=2))
+    print(', '.join(f'{k}: {len(v)}' for k, v in report.items()) + f', written to {report_path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+WebsiteDir = Path("import/website")
+
+# indiacode returns this page (with a 200) when it is throttling requests
+InaccessibleMarker = 'The specified URL is inaccessible at this time'
+PdfHeader = b'%PDF-'
+PdfTrailer = b'%%EOF'
+
+
+def get_act_web_number(url):
+    """Return the act web number from the 'View' url in act_infos.json."""
+    return url.replace('?view_type=browse', '').split('/')[-1]
+
+
+def iter_state_dirs(website_dir: Path = WebsiteDir, states=None):
+    """Yield state directories that have an act_infos.json, optionally restricted to `states`.
+
+    Args:
+        website_dir: Root of the website mirror.
+        states: Optional list of state directory names (e.g. 'Maharashtra', 'Tamil_Nadu').
+    """
+    for state_dir in sorted(website_dir.iterdir()):
+        if not (state_dir / 'act_infos.json').exists():
+            continue
+        if states and state_dir.name not in states:
+            continue
+        yield state_dir
+
+
+def load_act_infos(state_dir: Path):
+    return json.loads((state_dir / 'act_infos.json').read_text())
+
+
+def citation_pdf_path(act_dir: Path, citation_pdf_url):
+    """Local path of the citation PDF, same naming as fetch_acts.main()."""
+    citation_pdf = act_dir / 'citation_pdf' / Path(citation_pdf_url).name
+    if len(citation_pdf.name) > 128:
+        citation_pdf = citation_pdf.parent / f'{act_dir.name}.pdf'
+    return citation_pdf
+
+
+def act_pdf_path(act_dir: Path, act_pdf_url):
+    """Local path of an 'Other PDF', same naming as fetch_acts.main()."""
+    act_pdf_url = act_pdf_url.replace('nic.in ', 'nic.in')
+    act_pdf = act_dir / 'act_pdfs' / Path(act_pdf_url).name
+    if len(act_pdf.name) > 128:
+        act_pdf = act_pdf.parent / f'{act_dir.name}.pdf'
+    return act_pdf
+
+
+TmpSuffix = '.tmp'
+
+# mkstemp() creates files as 0600, atomic writes should get the usual umask-based mode
+_umask = os.umask(0)
+os.umask(_umask)
+FileMode = 0o666 & ~_umask
+
+
+@contextmanager
+def atomic_open(path, mode='w', **kwargs):
+    """Open a temp file next to `path` and rename it over `path` only if the block succeeds.
+
+    A crash or exception midway leaves `path` untouched (or absent), never truncated.
+    The temp name is unique (mkstemp), so workers on different hosts sharing the
+    filesystem never write to the same temp file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix=TmpSuffix)
+    tmp_path = Path(tmp_name)
+    try:
+        os.fchmod(fd, FileMode)
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def write_text_atomic(path, text: str):
+    if not text:
+        raise ValueError(f'Refusing to write empty content to {path}')
+    with atomic_open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
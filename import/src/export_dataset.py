@@ -0,0 +1,265 @@
+"""
+Export the crawled corpus as columnar (Parquet) datasets.
+
+Four datasets are written under the output directory: acts, sections, chapters
+and pdfs. Each one is hive partitioned by state and enactment year, e.g.
+
+    import/dataset/sections/state=Maharashtra/enactment_year=1999/part-0.parquet
+
+A manifest (_manifest.json, ignored by pyarrow dataset discovery) records a
+signature of the files each act was built from. On re-runs only the partitions
+containing new, changed or removed acts are rewritten.
+
+Usage: python export_dataset.py [output_dir] [State ...]
+"""
+
+import json
+import re
+import shutil
+import sys
+from pathlib import Path
+
+from corpus import WebsiteDir, get_act_web_number, iter_state_dirs, load_act_infos, citation_pdf_path, act_pdf_path
+
+DatasetDir = Path("import/dataset")
+ManifestName = '_manifest.json'
+UnknownYear = 'unknown'
+
+
+def get_schemas():
+    import pyarrow as pa
+
+    return {
+        'acts': pa.schema([
+            ('state', pa.string()),
+            ('enactment_year', pa.string()),
+            ('web_number', pa.string()),
+            ('web_act_id', pa.string()),
+            ('act_number', pa.string()),
+            ('short_title', pa.string()),
+            ('enactment_date', pa.string()),
+            ('url', pa.string()),
+            ('is_parsed', pa.bool_()),
+            ('num_sections', pa.int32()),
+            ('num_chapters', pa.int32()),
+            ('last_updated_date', pa.string()),
+        ]),
+        'sections': pa.schema([
+            ('state', pa.string()),
+            ('enactment_year', pa.string()),
+            ('act_web_number', pa.string()),
+            ('web_act_id', pa.string()),
+            ('position', pa.int32()),
+            ('web_number', pa.string()),
+            ('number', pa.string()),
+            ('title', pa.string()),
+            ('url', pa.string()),
+            ('has_notification', pa.bool_()),
+            ('is_fetched', pa.bool_()),
+        ]),
+        'chapters': pa.schema([
+            ('state', pa.string()),
+            ('enactment_year', pa.string()),
+            ('act_web_number', pa.string()),
+            ('position', pa.int32()),
+            ('number', pa.string()),
+            ('title', pa.string()),
+            ('chapter_id', pa.string()),
+            ('num_sub_chapters', pa.int32()),
+        ]),
+        'pdfs': pa.schema([
+            ('state', pa.string()),
+            ('enactment_year', pa.string()),
+            ('act_web_number', pa.string()),
+            ('kind', pa.string()),
+            ('url', pa.string()),
+            ('local_path', pa.string()),
+            ('is_fetched', pa.bool_()),
+            ('size', pa.int64()),
+        ]),
+    }
+
+
+def get_enactment_year(act_info):
+    """Enactment year from 'Enactment Date' (e.g. '21-May-1860'), falling back to the short title."""
+    m = re.search(r'(\d{4})\s*$', act_info.get('Enactment Date', ''))
+    if not m:
+        m = re.search(r'\b(\d{4})\b\.?\s*$', act_info.get('Short Title', ''))
+    return m.group(1) if m else UnknownYear
+
+
+def file_signature(path: Path):
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def dir_signature(path: Path):
+    try:
+        return sorted(p.name for p in path.iterdir())
+    except FileNotFoundError:
+        return None
+
+
+def get_act_signature(act_info, act_dir: Path):
+    """Signature of everything an act's rows are built from, used to detect changes between runs."""
+    web_number = act_dir.name
+    return [
+        act_info,
+        file_signature(act_dir / f'{web_number}.json'),
+        file_signature(act_dir / 'citation_pdf' / 'last_updated_date.json'),
+        dir_signature(act_dir / 'sections'),
+        dir_signature(act_dir / 'citation_pdf'),
+        dir_signature(act_dir / 'act_pdfs'),
+    ]
+
+
+def pdf_row(state, year, act_dir, kind, url, pdf_path: Path):
+    size = pdf_path.stat().st_size if pdf_path.exists() else None
+    return {
+        'state': state, 'enactment_year': year, 'act_web_number': act_dir.name, 'kind': kind,
+        'url': url, 'local_path': str(pdf_path), 'is_fetched': size is not None, 'size': size,
+    }
+
+
+def build_act_rows(state, year, act_info, act_dir: Path, rows):
+    """Append the rows of a single act to `rows` (a dict of dataset name -> list of rows)."""
+    web_number = act_dir.name
+    act_json_path = act_dir / f'{web_number}.json'
+    act_json = json.loads(act_json_path.read_text()) if act_json_path.exists() else {}
+
+    last_updated_date = None
+    last_updated_path = act_dir / 'citation_pdf' / 'last_updated_date.json'
+    if last_updated_path.exists():
+        try:
+            last_updated_date = json.loads(last_updated_path.read_text()).get('last_updated_date')
+        except Exception:
+            last_updated_date = None
+
+    web_act_id = act_json.get('web_act_id')
+    sections = act_json.get('sections', [])
+    chapters = act_json.get('chapters', [])
+    rows['acts'].append({
+        'state': state, 'enactment_year': year, 'web_number': web_number, 'web_act_id': web_act_id,
+        'act_number': act_info.get('Act Number'), 'short_title': act_info.get('Short Title'),
+        'enactment_date': act_info.get('Enactment Date'), 'url': act_info['View'],
+        'is_parsed': bool(act_json), 'num_sections': len(sections), 'num_chapters': len(chapters),
+        'last_updated_date': last_updated_date,
+    })
+
+    fetched_sections = set(dir_signature(act_dir / 'sections') or [])
+    for idx, section in enumerate(sections):
+        rows['sections'].append({
+            'state': state, 'enactment_year': year, 'act_web_number': web_number, 'web_act_id': web_act_id,
+            'position': idx, 'web_number': section['web_number'], 'number': section['number'],
+            'title': section['title'], 'url': section['url'], 'has_notification': section['has_notification'],
+            'is_fetched': f"{section['web_number']}.html" in fetched_sections,
+        })
+
+    for idx, chapter in enumerate(chapters):
+        rows['chapters'].append({
+            'state': state, 'enactment_year': year, 'act_web_number': web_number, 'position': idx,
+            'number': chapter['number'], 'title': chapter['title'], 'chapter_id': chapter.get('chapter_id'),
+            'num_sub_chapters': len(chapter.get('sub_chapters', [])),
+        })
+
+    for url in act_json.get('citation_pdf_urls', []):
+        rows['pdfs'].append(pdf_row(state, year, act_dir, 'citation', url, citation_pdf_path(act_dir, url)))
+    for url in act_json.get('pdf_urls', []):
+        url = url.replace('nic.in ', 'nic.in')
+        rows['pdfs'].append(pdf_row(state, year, act_dir, 'other', url, act_pdf_path(act_dir, url)))
+
+
+def partition_dir(dataset_dir: Path, state, year):
+    return dataset_dir / f'state={state}' / f'enactment_year={year}'
+
+
+def write_partitions(output_dir: Path, rows, dirty_partitions):
+    """Replace the dirty (state, year) partitions of every dataset with `rows`."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    for name, schema in get_schemas().items():
+        dataset_dir = output_dir / name
+        for state, year in dirty_partitions:
+            shutil.rmtree(partition_dir(dataset_dir, state, year), ignore_errors=True)
+
+        if not rows[name]:
+            continue
+        table = pa.Table.from_pylist(rows[name], schema=schema)
+        partitioning = ds.partitioning(
+            pa.schema([('state', pa.string()), ('enactment_year', pa.string())]), flavor='hive'
+        )
+        ds.write_dataset(
+            table,
+            base_dir=str(dataset_dir),
+            format='parquet',
+            partitioning=partitioning,
+            basename_template='part-{i}.parquet',
+            max_partitions=max(len(dirty_partitions), 1024),
+            existing_data_behavior='overwrite_or_ignore',
+        )
+        print(f'{name}: wrote {table.num_rows} rows')
+
+
+def export_dataset(output_dir: Path = DatasetDir, website_dir: Path = WebsiteDir, states=None):
+    """Export acts, sections, chapters and pdfs, rewriting only partitions whose acts changed.
+
+    Returns:
+        The set of (state, enactment_year) partitions that were rewritten.
+    """
+    manifest_path = output_dir / ManifestName
+    old_manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+    new_manifest, act_entries = {}, {}
+    for state_dir in iter_state_dirs(website_dir, states):
+        state = state_dir.name
+        for act_info in load_act_infos(state_dir):
+            act_dir = state_dir / get_act_web_number(act_info['View'])
+            key = f'{state}/{act_dir.name}'
+            year = get_enactment_year(act_info)
+            new_manifest[key] = {'year': year, 'signature': get_act_signature(act_info, act_dir)}
+            act_entries[key] = (state, year, act_info, act_dir)
+
+    # acts from states that were not selected are carried over untouched
+    if states:
+        for key, entry in old_manifest.items():
+            if key.split('/')[0] not in states:
+                new_manifest[key] = entry
+
+    dirty_partitions = set()
+    for key in set(old_manifest) | set(new_manifest):
+        old, new = old_manifest.get(key), new_manifest.get(key)
+        if old == new:
+            continue
+        state = key.split('/')[0]
+        for entry in (old, new):
+            if entry:
+                dirty_partitions.add((state, entry['year']))
+
+    if not dirty_partitions:
+        print('Dataset is up to date')
+        return dirty_partitions
+
+    rows = {name: [] for name in ('acts', 'sections', 'chapters', 'pdfs')}
+    for key, (state, year, act_info, act_dir) in act_entries.items():
+        if (state, year) in dirty_partitions:
+            build_act_rows(state, year, act_info, act_dir, rows)
+
+    print(f'Rewriting {len(dirty_partitions)} partitions')
+    output_dir.mkdir(parents=True, exist_ok=True)
+    write_partitions(output_dir, rows, dirty_partitions)
+    manifest_path.write_text(json.dumps(new_manifest))
+    return dirty_partitions
+
+
+def main():
+    output_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else DatasetDir
+    states = sys.argv[2:]
+    export_dataset(output_dir, WebsiteDir, states)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,15 +6,22 @@ import sys
 import time
 import subprocess
 from urllib.parse import urlparse
-from playwright.sync_api import sync_playwright
-import pdfplumber
 import re
 
+from corpus import citation_pdf_path, act_pdf_path, atomic_open, write_text_atomic, PdfHeader
+from corpus import get_act_web_number
+from check_integrity import apply_repair_list
+from normalize_html import normalize_act_html, normalize_section_html, normalize_chapter_html
+from normalize_html import get_act_error, get_chapter_error, get_section_error
+from act_structure import build_act_structure, get_structure_path, parse_headings, list_chapter_pages, get_chapter_url, get_heading_label
+
 def extract_date_from_citation_pdf(pdf_path: str):
     """
     Reads the first 10 lines of the PDF, checks for 'section', and extracts a last updated date if present.
     Returns: (date_string, full_text)
     """
+    import pdfplumber
+
     lines = []
     try:
         with pdfplumber.open(pdf_path) as pdf:
@@ -123,11 +130,12 @@ def fetch_pdf(url, output_path):
     try:
         response = requests.get(url, headers=headers, stream=True, timeout=30)
         response.raise_for_status()  # Raise an exception for bad status codes
-        # If output_path is provided, save to file
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, 'wb') as f:
+        # Stream into a temp file, only a complete download replaces output_path
+        with atomic_open(output_path, 'wb') as f:
             for chunk in response.iter_content(chunk_size=8192):
                 if chunk:  # filter out keep-alive new chunks
+                    if f.tell() == 0 and not chunk.startswith(PdfHeader):
+                        raise ValueError(f'Response is not a PDF: {chunk[:64]!r}')
                     f.write(chunk)
         return True
     except requests.exceptions.RequestException as e:
@@ -260,29 +268,40 @@ def fetch_section(web_act_id, section_info, section_dir: Path):
     section_xhr_url = f'https://www.indiacode.nic.in/SectionPageContent?&actid={web_act_id}&sectionID={section_info.web_number}'
     section_xhr_str = fetch_page_playwright(section_xhr_url)
 
-    if section_xhr_str is None:
-        print(f'\tFailed to fetch section {section_info.web_number}')
+    # check_integrity.py would flag anything rejected here, so never cache it
+    error = get_section_error(section_xhr_str) if section_xhr_str is not None else 'no response'
+    if error:
+        print(f'\tFailed to fetch section {section_info.web_number}: {error}')
         return None
 
     # Save the section content
-    section_html_path.write_text(section_xhr_str)
+    section_xhr_str = normalize_section_html(section_xhr_str)
+    write_text_atomic(section_html_path, section_xhr_str)
 
     # Handle notifications if they exist
     if section_info.has_notification:
-        try:
-            notification_url = f'https://www.indiacode.nic.in/SectionPageContent?&actid={web_act_id}&sectionID={section_info.web_number}&orgactid={web_act_id}'
-            notification_xhr_str = fetch_page_playwright(notification_url)
+        fetch_notification(web_act_id, section_info, section_dir)
 
-            if notification_xhr_str:
-                notification_html_path = section_dir / f'{section_info.web_number}_notification.html'
-                notification_html_path.write_text(notification_xhr_str)
-            else:
-                print(f'\tFailed to fetch notification for section {section_info.web_number}')
+    return section_xhr_str
 
-        except Exception as e:
-            print(f'\tError fetching notification for section {section_info.web_number}: {str(e)}')
 
-    return section_xhr_str
+def fetch_notification(web_act_id, section_info, section_dir: Path):
+    """Fetch the notification of a section, returns True if it was saved."""
+    try:
+        notification_url = f'https://www.indiacode.nic.in/SectionPageContent?&actid={web_act_id}&sectionID={section_info.web_number}&orgactid={web_act_id}'
+        notification_xhr_str = fetch_page_playwright(notification_url)
+
+        error = get_section_error(notification_xhr_str) if notification_xhr_str is not None else 'no response'
+        if not error:
+            notification_html_path = section_dir / f'{section_info.web_number}_notification.html'
+            write_text_atomic(notification_html_path, normalize_section_html(notification_xhr_str))
+            return True
+        else:
+            print(f'\tFailed to fetch notification for section {section_info.web_number}: {error}')
+
+    except Exception as e:
+        print(f'\tError fetching notification for section {section_info.web_number}: {str(e)}')
+    return False
 
 
 def fetch_act(act_url, act_web_number, website_dir: Path):
@@ -301,52 +320,51 @@ def fetch_act(act_url, act_web_number, website_dir: Path):
         html_str = html_path.read_text()
     else:
         html_str = fetch_page_playwright(act_url)
-        html_path.write_text(html_str)
+        error = get_act_error(html_str) if html_str is not None else 'no response'
+        if error:
+            print(f'\tFailed to fetch act {act_web_number}: {error}')
+            return None
+        html_str = normalize_act_html(html_str)
+        write_text_atomic(html_path, html_str)
+
+    act_details, structure = build_act(html_str, act_url, act_web_number, act_dir)
+    write_text_atomic(json_path, act_details.model_dump_json())
+    if structure is not None:
+        write_text_atomic(get_structure_path(act_dir), structure.model_dump_json(exclude_defaults=True))
+    return act_details
 
-    from lxml import etree
-    parser = etree.HTMLParser()
-    tree = etree.fromstring(html_str, parser)
 
-    # --- Extract Chapters ---
-    chapters = []
-    # Find the div with class 'col-sm-4' inside the 'tb1' tab
-    col_divs = tree.xpath('//div[contains(@class, "col-sm-4")]')
-    if col_divs:
-        col_div = col_divs[0]
-        li_nodes = col_div.xpath('./li')
-    else:
-        li_nodes = []
-
-    chapter_sections = []
-    for idx, li in enumerate(li_nodes):
-        number_elem = li.xpath('./b/text()')
-        number = number_elem[0].strip() if number_elem else None
-        print('Chapter: ', number)
-        if not number:
-            print('\tChapter number not found')
-            continue
+def build_act(html_str, act_url, act_web_number, act_dir: Path):
+    """Parse the act page and build its chapter structure from the cached chapter pages.
 
-        # Get first <ul><li>
-        inner_li = li.xpath('./ul/li')[0]
-
-        # CASE 1: Single chapter with <a class="headingtwo">
-        a_tag = inner_li.xpath('./a[@class="headingtwo"]')
-        if a_tag:
-            title = a_tag[0].text.strip()
-            chapter_id = a_tag[0].get('id')
-            sub_chapters = []
+    Returns:
+        tuple: (ActDetails, ActStructure or None if the act has no sections)
+    """
+    from lxml import etree
+    tree = etree.fromstring(html_str, etree.HTMLParser())
+    act_details = parse_act(html_str, act_url, act_web_number, tree)
+    if not act_details.sections:
+        return act_details, None
+    return act_details, build_act_structure(act_details, tree, act_dir)
 
-        else:
-            title_text = inner_li.xpath('text()')
-            title = title_text[0].strip() if title_text else None
-            chapter_id = None
 
-            sub_chapters = [
-                (a.get('id'), a.text.strip())
-                for a in inner_li.xpath('./ul/li/a[@class="headingthree"]')
-            ]
+def parse_act(html_str, act_url, act_web_number, tree=None):
+    """Parse chapters, sections and PDF links from the act page, no network involved."""
+    if tree is None:
+        from lxml import etree
+        tree = etree.fromstring(html_str, etree.HTMLParser())
 
-        chapters.append(ChapterInfo(number=number, title=title, chapter_id=chapter_id, sub_chapters=sub_chapters, sections=chapter_sections))
+    # --- Extract Chapters ---
+    # same chapter list as the structure index, so ChapterInfo.sections can be filled from it
+    chapters = []
+    for node in parse_headings(tree):
+        print('Chapter: ', node.number)
+        if node.children:
+            title, chapter_id = node.title or '', None
+            sub_chapters = [(sub.heading_id, sub.title) for sub in node.children]
+        else:
+            title, chapter_id, sub_chapters = node.title or '', node.heading_id, []
+        chapters.append(ChapterInfo(number=node.number, title=title, chapter_id=chapter_id, sub_chapters=sub_chapters, sections=[]))
 
     # --- Extract Sections ---
     # print(etree.tostring(content_div, encoding="unicode", pretty_print=True))
@@ -386,8 +404,6 @@ def fetch_act(act_url, act_web_number, website_dir: Path):
         pdf_urls=new_pdf_urls,
         citation_pdf_urls=citation_pdf_urls
     )
-    json_path = act_dir / f'{act_web_number}.json'
-    json_path.write_text(act_details.model_dump_json())
     return act_details
 
 
@@ -413,11 +429,56 @@ def extract_pdf_links(html_tree):
     return citation_urls, pdf_links
 
 
+def fetch_chapter_page(chapter_url, page_path: Path, label):
+    """Fetch one /ChapterIndexWiseSection page, returns True if it was saved."""
+    print(f'\tChapter: {label}: fetching...')
+    page_str = fetch_page_playwright(chapter_url)
+    error = get_chapter_error(page_str) if page_str is not None else 'no response'
+    if error:
+        print(f'\tFailed to fetch chapter {label}: {error}')
+        return False
+    write_text_atomic(page_path, normalize_chapter_html(page_str))
+    return True
+
+
+def fetch_chapter_pages(act_details, act_dir: Path):
+    """Fetch the /ChapterIndexWiseSection page of every chapter heading, returns True if any was fetched."""
+    if not act_details.sections:
+        return False
+
+    fetched = False
+    for chapter, heading, page_path in list_chapter_pages(act_dir):
+        label = get_heading_label(chapter, heading)
+        if page_path.exists():
+            print(f'\tChapter: {label}: already exists')
+            continue
+        if fetch_chapter_page(get_chapter_url(act_details, heading), page_path, label):
+            fetched = True
+    return fetched
+
+
+def save_last_updated_date(citation_pdf: Path, citation_pdf_url):
+    """Extract the last updated date from the citation PDF into last_updated_date.json."""
+    date_json_path = citation_pdf.parent / 'last_updated_date.json'
+    date_str, joined_texts = extract_date_from_citation_pdf(str(citation_pdf))
+    if date_str:
+        write_text_atomic(date_json_path, json.dumps({'last_updated_date': date_str}))
+        print(f'\tExtracted last updated date: {date_str}')
+    else:
+        print(f'#\tNo last updated date found. {citation_pdf_url}.')
+        print('#' + '\n#'.join(joined_texts or []) + '\n#===========================')
+    return date_str
+
+
 WebsiteDir = Path("import/website")
 
 def main():
     act_infos_file = Path(sys.argv[1])
     act_infos = json.loads(act_infos_file.read_text())
+    if len(sys.argv) > 2:
+        # Re-crawl only the acts with bad files listed in a repair list from check_integrity.py
+        repair_web_numbers = apply_repair_list(Path(sys.argv[2]), WebsiteDir / act_infos_file.parent.name)
+        act_infos = [a for a in act_infos if get_act_web_number(a['View']) in repair_web_numbers]
     num_acts = len(act_infos)
     for idx, act_info in enumerate(act_infos):
         url = act_info['View']
@@ -430,6 +491,12 @@ def main():
 
         # Get act details
         act_details = fetch_act(url, act_web_number, state_dir)
+        if act_details is None:
+            continue
+
+        # Map sections to chapters, rebuilding the structure from the cache if new pages came in
+        if fetch_chapter_pages(act_details, state_dir / act_web_number):
+            act_details = fetch_act(url, act_web_number, state_dir)
 
         # Download Act PDF
         act_pdf = state_dir / act_web_number / 'act_web_number.pdf'
@@ -445,9 +512,7 @@ def main():
         # Download both citation and act pdfs
         if act_details.citation_pdf_urls:
             citation_pdf_url = act_details.citation_pdf_urls[0]
-            citation_pdf = state_dir / act_web_number / 'citation_pdf' / Path(citation_pdf_url).name
-            if len(citation_pdf.name) > 128:
-                citation_pdf = citation_pdf.parent / f'{act_web_number}.pdf'
+            citation_pdf = citation_pdf_path(state_dir / act_web_number, citation_pdf_url)
 
             if citation_pdf.exists():
                 print(f'\tCitation PDF: {citation_pdf_url}: already exists')
@@ -456,29 +521,12 @@ def main():
                 fetch_pdf(citation_pdf_url, citation_pdf)
 
             # If there are sections and citation_pdf exists, extract last updated date
-
-            date_json_path = citation_pdf.parent / 'last_updated_date.json'
-            if act_details.sections and citation_pdf.exists():# and not date_json_path.exists():
-                # if str(act_web_number) == '19823':
-                #     import pdb
-                #     pdb.set_trace()
-                date_str, joined_texts   = extract_date_from_citation_pdf(str(citation_pdf))
-                # print('\n'.join(joined_texts))
-                if date_str:
-                    with open(date_json_path, 'w') as f:
-                        json.dump({'last_updated_date': date_str}, f)
-                    print(f'\tExtracted last updated date: {date_str}')
-                else:
-                    print(f'#\tNo last updated date found. {citation_pdf_url}.')
-                    print('#' + '\n#'.join(joined_texts) + '\n#===========================')
-
-                #import pdb; pdb.set_trace()
+            if act_details.sections and citation_pdf.exists():
+                save_last_updated_date(citation_pdf, citation_pdf_url)
 
         for act_pdf_url in act_details.pdf_urls:
             act_pdf_url = act_pdf_url.replace('nic.in ', 'nic.in')
-            act_pdf = state_dir / act_web_number / 'act_pdfs' / Path(act_pdf_url).name
-            if len(act_pdf.name) > 128:
-                act_pdf = act_pdf.parent / f'{act_web_number}.pdf'
+            act_pdf = act_pdf_path(state_dir / act_web_number, act_pdf_url)
             if act_pdf.exists():
                 print(f'\tAct PDF: {act_pdf_url}: already exists')
             else:
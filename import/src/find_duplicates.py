@@ -0,0 +1,290 @@
+"""
+Find near-duplicate sections across acts and states with MinHash and LSH.
+
+Section text is split into word shingles, and MinHash signatures are computed
+for batches of sections at a time with numpy. LSH banding then groups sections
+whose signatures agree on a whole band, which gives the candidate pairs in about
+linear time. Only pairs from different acts whose estimated Jaccard similarity
+is at least Threshold are reported.
+
+Model provisions copied into many acts fill buckets too large to list pairwise.
+Those buckets are reported as clusters instead (clusters.json): the sections
+whose estimated similarity to a leader section is at least Threshold.
+
+The index (signatures.npz) keeps one signature per section, keyed by
+state/act/section and stamped with the file's mtime and size. Re-runs only
+compute signatures for new or changed sections and drop removed ones. The
+candidate pairs are then rebuilt from all the signatures.
+
+Usage: python find_duplicates.py [index_dir] [State ...]
+"""
+
+import json
+import re
+import sys
+import time
+import zlib
+from pathlib import Path
+
+from corpus import WebsiteDir, iter_state_dirs, write_text_atomic, atomic_open
+from normalize_html import load_section_fragment, get_fragment_text
+
+IndexDir = Path("import/similarity")
+
+ShingleSize = 5
+MinWords = 20
+NumPerm = 128
+NumBands = 32
+RowsPerBand = NumPerm // NumBands
+Threshold = 0.8
+MaxBucketSize = 200  # larger buckets are reported as clusters, their pairs grow quadratically
+BatchShingles = 50_000
+Seed = 42
+
+# (a * h + b) mod prime, with 32 bit shingle hashes a * h stays below 2**63
+MersennePrime = (1 << 61) - 1
+MaxHash = (1 << 32) - 1
+WordRegex = re.compile(r'\w+')
+
+
+def get_permutations():
+    import numpy as np
+
+    rng = np.random.default_rng(Seed)
+    a = rng.integers(1, 1 << 31, size=NumPerm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 31, size=NumPerm, dtype=np.uint64)
+    return a, b
+
+
+def get_shingle_hashes(text):
+    words = WordRegex.findall(text.lower())
+    if len(words) < MinWords:
+        return None
+    shingles = {' '.join(words[i:i + ShingleSize]) for i in range(len(words) - ShingleSize + 1)}
+    return [zlib.crc32(s.encode('utf-8')) for s in shingles]
+
+
+def compute_signatures(shingle_hashes_list, permutations):
+    """MinHash signatures (len(list) x NumPerm, uint32) for a batch of sections, in one vectorized pass."""
+    import numpy as np
+
+    a, b = permutations
+    lengths = np.array([len(h) for h in shingle_hashes_list])
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    hashes = np.fromiter((h for hs in shingle_hashes_list for h in hs), dtype=np.uint64, count=lengths.sum())
+
+    permuted = (np.outer(a, hashes) + b[:, None]) % np.uint64(MersennePrime) & np.uint64(MaxHash)
+    return np.minimum.reduceat(permuted, offsets, axis=1).T.astype(np.uint32)
+
+
+def list_sections(states=None):
+    """Yield (key, path) for cached section fragments, key is 'state/act_web_number/section_web_number'."""
+    for state_dir in iter_state_dirs(WebsiteDir, states):
+        for section_path in sorted(state_dir.glob('*/sections/*.html')):
+            if section_path.stem.endswith('_notification'):
+                continue
+            act_web_number = section_path.parent.parent.name
+            yield f'{state_dir.name}/{act_web_number}/{section_path.stem}', section_path
+
+
+def get_stamp(path: Path):
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_index(index_dir: Path):
+    import numpy as np
+
+    index_path = index_dir / 'signatures.npz'
+    if not index_path.exists():
+        return {}
+    data = np.load(index_path)
+    return {
+        key: (tuple(stamp), signature)
+        for key, stamp, signature in zip(data['keys'].tolist(), data['stamps'], data['signatures'])
+    }
+
+
+def save_index(index_dir: Path, index):
+    import numpy as np
+
+    keys = sorted(index)
+    with atomic_open(index_dir / 'signatures.npz', 'wb') as f:
+        np.savez(
+            f,
+            keys=np.array(keys, dtype=str),
+            stamps=np.array([index[k][0] for k in keys], dtype=np.int64).reshape(-1, 2),
+            signatures=np.array([index[k][1] for k in keys], dtype=np.uint32).reshape(-1, NumPerm),
+        )
+
+
+def update_index(index, states=None):
+    """Add signatures of new or changed sections and drop removed ones, returns the number computed."""
+    permutations = get_permutations()
+    selected_states = set(states or [])
+    seen_keys = set()
+    batch_keys, batch_stamps, batch_hashes, batch_size = [], [], [], 0
+    num_computed = 0
+
+    def flush():
+        signatures = compute_signatures(batch_hashes, permutations)
+        for key, stamp, signature in zip(batch_keys, batch_stamps, signatures):
+            index[key] = (stamp, signature)
+        batch_keys.clear()
+        batch_stamps.clear()
+        batch_hashes.clear()
+
+    for key, section_path in list_sections(states):
+        seen_keys.add(key)
+        stamp = get_stamp(section_path)
+        if key in index and index[key][0] == stamp:
+            continue
+        shingle_hashes = get_shingle_hashes(get_fragment_text(load_section_fragment(section_path)))
+        if not shingle_hashes:
+            index.pop(key, None)
+            continue
+        batch_keys.append(key)
+        batch_stamps.append(stamp)
+        batch_hashes.append(shingle_hashes)
+        batch_size += len(shingle_hashes)
+        num_computed += 1
+        if batch_size >= BatchShingles:
+            flush()
+            batch_size = 0
+    if batch_keys:
+        flush()
+
+    for key in list(index):
+        state = key.split('/')[0]
+        if key not in seen_keys and (not selected_states or state in selected_states):
+            del index[key]
+    return num_computed
+
+
+def find_candidate_pairs(keys, signatures):
+    """LSH banding: sections that agree on every row of some band become candidate pairs.
+
+    Returns:
+        tuple: (candidate pairs, member arrays of the buckets larger than MaxBucketSize)
+    """
+    import numpy as np
+
+    act_keys = [k.rsplit('/', 1)[0] for k in keys]
+    candidates, large_buckets = set(), {}
+    for band in range(NumBands):
+        band_rows = np.ascontiguousarray(signatures[:, band * RowsPerBand:(band + 1) * RowsPerBand])
+        band_keys = band_rows.view(np.dtype((np.void, band_rows.dtype.itemsize * RowsPerBand))).ravel()
+        _, inverse, counts = np.unique(band_keys, return_inverse=True, return_counts=True)
+        order = np.argsort(inverse, kind='stable')
+        boundaries = np.cumsum(counts)[:-1]
+        for bucket, count in zip(np.split(order, boundaries), counts):
+            if count < 2:
+                continue
+            if count > MaxBucketSize:
+                # the same sections often share several bands
+                large_buckets.setdefault(tuple(bucket.tolist()), bucket)
+                continue
+            bucket = bucket.tolist()
+            for i_pos, i in enumerate(bucket):
+                for j in bucket[i_pos + 1:]:
+                    if act_keys[i] != act_keys[j]:
+                        candidates.add((i, j) if i < j else (j, i))
+    return candidates, list(large_buckets.values())
+
+
+def merge_buckets(large_buckets):
+    """Union the large buckets that share sections (a group of copies fills one bucket per band)."""
+    import numpy as np
+
+    parent = {}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for bucket in large_buckets:
+        members = bucket.tolist()
+        for i in members:
+            parent.setdefault(i, i)
+        root = find(members[0])
+        for i in members[1:]:
+            parent[find(i)] = root
+
+    groups = {}
+    for i in parent:
+        groups.setdefault(find(i), []).append(i)
+    return [np.array(sorted(members)) for members in groups.values()]
+
+
+def find_clusters(keys, signatures, large_buckets):
+    """Split the merged large buckets into clusters of sections at least Threshold similar to a leader section."""
+    act_keys = [k.rsplit('/', 1)[0] for k in keys]
+    clusters = {}
+    for remaining in merge_buckets(large_buckets):
+        while len(remaining) >= 2:
+            similarities = (signatures[remaining] == signatures[remaining[0]]).mean(axis=1)
+            is_member = similarities >= Threshold
+            members = remaining[is_member].tolist()
+            if len({act_keys[i] for i in members}) > 1:
+                member_keys = tuple(sorted(keys[i] for i in members))
+                clusters[member_keys] = float(similarities[is_member].min())
+            remaining = remaining[~is_member]
+
+    return sorted(
+        (
+            {
+                'size': len(member_keys),
+                'states': sorted({k.split('/')[0] for k in member_keys}),
+                'min_similarity': round(min_similarity, 3),
+                'sections': list(member_keys),
+            }
+            for member_keys, min_similarity in clusters.items()
+        ),
+        key=lambda c: (-c['size'], c['sections'][0]),
+    )
+
+
+def find_duplicates(index):
+    import numpy as np
+
+    keys = sorted(index)
+    if not keys:
+        return [], []
+    signatures = np.array([index[k][1] for k in keys], dtype=np.uint32)
+    candidates, large_buckets = find_candidate_pairs(keys, signatures)
+
+    duplicates = []
+    if candidates:
+        pairs = np.array(sorted(candidates))
+        similarities = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+        for (i, j), similarity in zip(pairs.tolist(), similarities.tolist()):
+            if similarity >= Threshold:
+                duplicates.append({'a': keys[i], 'b': keys[j], 'similarity': round(similarity, 3)})
+    duplicates.sort(key=lambda d: (-d['similarity'], d['a'], d['b']))
+    return duplicates, find_clusters(keys, signatures, large_buckets)
+
+
+def main():
+    index_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else IndexDir
+    states = sys.argv[2:]
+
+    start = time.time()
+    index = load_index(index_dir)
+    num_computed = update_index(index, states)
+    save_index(index_dir, index)
+    print(f'Index: {len(index)} sections, {num_computed} signatures computed in {time.time() - start:.1f}s')
+
+    duplicates, clusters = find_duplicates(index)
+    write_text_atomic(index_dir / 'duplicates.json', json.dumps(duplicates, indent=2))
+    write_text_atomic(index_dir / 'clusters.json', json.dumps(clusters, indent=2))
+
+    num_cross_state = sum(d['a'].split('/')[0] != d['b'].split('/')[0] for d in duplicates)
+    print(f'{len(duplicates)} near-duplicate pairs ({num_cross_state} across states) in {time.time() - start:.1f}s')
+    if clusters:
+        print(f'{len(clusters)} clusters of widely copied sections, largest has {clusters[0]["size"]}')
+
+
+if __name__ == '__main__':
+    main()
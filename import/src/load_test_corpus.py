@@ -0,0 +1,108 @@
+"""
+Load test for serve_corpus.py.
+
+Discovers act and section URLs from the running server, then replays a mix of
+list, act, section and 'updated after' requests from several keep-alive client
+threads for a fixed duration. Prints throughput, latency percentiles and status
+counts.
+
+Usage: python load_test_corpus.py [base_url] [seconds] [concurrency]
+"""
+
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse, quote
+
+BaseURL = 'http://127.0.0.1:8000'
+Seconds = 10
+Concurrency = 8
+MaxActs = 200
+
+
+def get_json(base_url, path):
+    url = urlparse(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port)
+    conn.request('GET', path)
+    response = conn.getresponse()
+    body = json.loads(response.read())
+    conn.close()
+    return body
+
+
+def discover_paths(base_url):
+    paths = ['/states']
+    for state_info in get_json(base_url, '/states'):
+        state = quote(state_info['state'])
+        paths.append(f'/states/{state}/acts')
+        paths.append(f'/states/{state}/acts?updated_after=2020-01-01')
+        acts = get_json(base_url, f'/states/{state}/acts?per_page=500')['items']
+        for act in acts[:MaxActs]:
+            if not act['num_sections']:
+                continue
+            act_path = f'/acts/{state}/{act["web_number"]}'
+            paths += [act_path, f'{act_path}/sections']
+            sections = get_json(base_url, f'{act_path}/sections?per_page=5')['items']
+            paths += [f'{act_path}/sections/{s["web_number"]}' for s in sections]
+    return paths
+
+
+def run_client(base_url, paths, deadline, latencies, statuses, lock):
+    url = urlparse(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port)
+    etags = {}
+    local_latencies, local_statuses = [], Counter()
+    while time.time() < deadline:
+        path = random.choice(paths)
+        headers = {'Accept-Encoding': 'gzip'}
+        # revalidate half of the repeat requests, like a client with a cache
+        if path in etags and random.random() < 0.5:
+            headers['If-None-Match'] = etags[path]
+        start = time.perf_counter()
+        conn.request('GET', path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        local_latencies.append(time.perf_counter() - start)
+        local_statuses[response.status] += 1
+        if response.getheader('ETag'):
+            etags[path] = response.getheader('ETag')
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        statuses.update(local_statuses)
+
+
+def main():
+    base_url = sys.argv[1] if len(sys.argv) > 1 else BaseURL
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else Seconds
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else Concurrency
+
+    paths = discover_paths(base_url)
+    print(f'{len(paths)} distinct paths, {concurrency} clients for {seconds}s')
+
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    deadline = time.time() + seconds
+    threads = [
+        threading.Thread(target=run_client, args=(base_url, paths, deadline, latencies, statuses, lock))
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f'{len(latencies)} requests, {len(latencies) / seconds:.0f} req/s')
+    print(f'latency ms: p50 {percentile(0.5):.2f}, p95 {percentile(0.95):.2f}, p99 {percentile(0.99):.2f}')
+    print('statuses: ' + ', '.join(f'{status}: {count}' for status, count in sorted(statuses.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""
+Strip the page chrome from cached indiacode pages, keeping only what we parse.
+
+Act pages keep the citation meta tags, the chapter list (first 'col-sm-4' div),
+the 'myTableActSection' table and the bitstream PDF links. Chapter pages keep
+the 'myTableActChapterIndexSection' table. Section and
+notification fragments are stored as the raw section JSON, unwrapping the
+browser's <pre> viewer when the page was saved from a Playwright render.
+
+fetch_acts.py normalizes at write time; this script migrates an existing tree:
+
+Usage: python normalize_html.py [State ...]
+"""
+
+import html
+import json
+import os
+import re
+import sys
+from multiprocessing import Pool
+from pathlib import Path
+
+from corpus import WebsiteDir, InaccessibleMarker, iter_state_dirs, write_text_atomic
+
+NormalizedMarker = '<meta name="incode-normalized" content="1">'
+PreRegex = re.compile(r'<pre[^>]*>(.*?)</pre>', re.DOTALL | re.IGNORECASE)
+TagRegex = re.compile(r'<[^>]+>')
+
+ChapterXPath = '(//div[contains(@class, "col-sm-4")])[1]'
+SectionTableXPath = '//table[@id="myTableActSection"]'
+ChapterTableXPath = '//table[@id="myTableActChapterIndexSection"]'
+CitationMetaXPath = '//meta[starts-with(@name, "citation_")]'
+PdfLinkXPath = '//a[contains(@href, "/bitstream/") and contains(@href, ".pdf")]'
+
+
+def is_normalized(html_str):
+    return NormalizedMarker in html_str[:256]
+
+
+def normalize_act_html(html_str):
+    """Return a minimal act page with the regions fetch_act() parses, in document order.
+
+    Pages that are already normalized, or that are not act pages at all, are returned unchanged.
+    """
+    if is_normalized(html_str) or InaccessibleMarker in html_str:
+        return html_str
+
+    from lxml import etree
+    tree = etree.fromstring(html_str, etree.HTMLParser())
+    if tree is None:
+        return html_str
+
+    body_regions = tree.xpath(ChapterXPath) + tree.xpath(SectionTableXPath)
+    # bitstream links outside the kept regions, wrapped so they keep their order
+    pdf_links = [
+        a for a in tree.xpath(PdfLinkXPath)
+        if not any(region in a.iterancestors() for region in body_regions)
+    ]
+
+    head = ''.join(etree.tostring(m, method='html', encoding='unicode') for m in tree.xpath(CitationMetaXPath))
+    body = ''.join(etree.tostring(r, method='html', encoding='unicode', with_tail=False) for r in body_regions)
+    links = ''.join(
+        f'<a href="{html.escape(a.get("href"))}">{html.escape(a.text or "")}</a>\n' for a in pdf_links
+    )
+    return (
+        f'<html><head>{NormalizedMarker}\n{head}</head>'
+        f'<body>\n{body}\n<div class="pdf-links">\n{links}</div>\n</body></html>\n'
+    )
+
+
+def normalize_chapter_html(html_str):
+    """Return just the section table of a /ChapterIndexWiseSection page."""
+    if is_normalized(html_str):
+        return html_str
+
+    from lxml import etree
+    tree = etree.fromstring(html_str, etree.HTMLParser())
+    tables = tree.xpath(ChapterTableXPath) if tree is not None else []
+    if not tables:
+        return html_str
+    table = etree.tostring(tables[0], method='html', encoding='unicode', with_tail=False)
+    return f'<html><head>{NormalizedMarker}\n</head><body>\n{table}\n</body></html>\n'
+
+
+def normalize_section_html(section_str):
+    """Return the raw section JSON, unwrapping the browser's <pre> viewer if present."""
+    if not section_str.lstrip().startswith('<'):
+        return section_str
+    m = PreRegex.search(section_str)
+    if not m:
+        return section_str
+    json_str = html.unescape(m.group(1))
+    try:
+        json.loads(json_str)
+    except ValueError:
+        return section_str
+    return json_str
+
+
+def get_page_error(html_str, required_marker, missing_reason):
+    if not html_str.strip():
+        return 'empty file'
+    if InaccessibleMarker in html_str:
+        return 'inaccessible error page'
+    if required_marker not in html_str:
+        return missing_reason
+    return None
+
+
+def get_act_error(html_str):
+    """Why an act page is unusable (error page, truncated, ...), None if it has the section table."""
+    return get_page_error(html_str, 'myTableActSection', 'missing myTableActSection table')
+
+
+def get_chapter_error(html_str):
+    """Why a /ChapterIndexWiseSection page is unusable, None if it links the heading's sections."""
+    return get_page_error(html_str, 'sectionId=', 'missing chapter section links')
+
+
+def get_section_error(section_str):
+    """Why a section/notification response is unusable, None if it holds the section JSON object."""
+    if not section_str.strip():
+        return 'empty file'
+    if InaccessibleMarker in section_str:
+        return 'inaccessible error page'
+    json_str = normalize_section_html(section_str)
+    if json_str.lstrip().startswith('<'):
+        return 'missing section fragment'
+    try:
+        fragment = json.loads(json_str)
+    except ValueError:
+        return 'section fragment is not valid json'
+    if not isinstance(fragment, dict):
+        return 'section fragment is not a json object'
+    return None
+
+
+def load_section_fragment(section_path: Path):
+    """Return the section JSON ({'content': ..., 'footnote': ...}) of a cached fragment, None if unreadable."""
+    try:
+        return json.loads(normalize_section_html(section_path.read_text()))
+    except ValueError:
+        return None
+
+
+def get_fragment_text(fragment, key='content'):
+    """Plain text of a fragment field, with the markup stripped."""
+    text = TagRegex.sub(' ', (fragment or {}).get(key) or '')
+    return html.unescape(text)
+
+
+def normalize_file(path_str):
+    """Normalize a cached page in place, returns (path, size before, size after)."""
+    path = Path(path_str)
+    text = path.read_text()
+    if path.parent.name == 'sections':
+        new_text = normalize_section_html(text)
+    elif path.parent.name == 'chapters':
+        new_text = normalize_chapter_html(text)
+    else:
+        new_text = normalize_act_html(text)
+
+    if new_text != text:
+        write_text_atomic(path, new_text)
+    return path_str, len(text), len(new_text)
+
+
+def list_pages(state_dir: Path):
+    """Yield act pages, chapter pages and section/notification fragments of a state."""
+    for act_dir in state_dir.iterdir():
+        if not act_dir.is_dir():
+            continue
+        act_html = act_dir / f'{act_dir.name}.html'
+        if act_html.exists():
+            yield act_html
+        for page_dir in (act_dir / 'sections', act_dir / 'chapters'):
+            if page_dir.exists():
+                for entry in os.scandir(page_dir):
+                    if entry.name.endswith('.html'):
+                        yield Path(entry.path)
+
+
+def main():
+    states = sys.argv[1:]
+    paths = [str(p) for state_dir in iter_state_dirs(WebsiteDir, states) for p in list_pages(state_dir)]
+
+    print(f'Normalizing {len(paths)} pages')
+    total_before, total_after, num_changed = 0, 0, 0
+    with Pool() as pool:
+        for path_str, size_before, size_after in pool.imap_unordered(normalize_file, paths, chunksize=64):
+            total_before += size_before
+            total_after += size_after
+            num_changed += size_before != size_after
+
+    print(f'Normalized {num_changed} pages: {total_before:,} -> {total_after:,} chars')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Regenerate every <web_number>.json (and <web_number>_structure.json) from the
+cached act and chapter pages, without the crawler.
+
+Runs parse_act() over a process pool; no network or browser is involved, so a
+fix to the chapter/section extraction can be applied to the whole corpus in one
+quick pass. Only JSON files whose content changes are rewritten.
+
+Usage: python reparse_acts.py [State ...]
+"""
+
+import contextlib
+import io
+import sys
+from multiprocessing import Pool
+
+from corpus import WebsiteDir, get_act_web_number, iter_state_dirs, load_act_infos, write_text_atomic
+
+
+def reparse_act(args):
+    """Parse a cached act page and rebuild its structure, returns (html path, status)."""
+    act_url, html_path, json_path = args
+    from fetch_acts import build_act
+    from act_structure import get_structure_path
+
+    act_dir = html_path.parent
+    try:
+        # parse_act() logs every chapter, which is noise in a full-corpus pass
+        with contextlib.redirect_stdout(io.StringIO()):
+            act_details, structure = build_act(html_path.read_text(), act_url, act_dir.name, act_dir)
+    except Exception as e:
+        return html_path, f'failed: {e!r}'
+
+    outputs = [(json_path, act_details.model_dump_json())]
+    if structure is not None:
+        outputs.append((get_structure_path(act_dir), structure.model_dump_json(exclude_defaults=True)))
+
+    status = 'unchanged'
+    for path, content in outputs:
+        if not path.exists() or path.read_text() != content:
+            write_text_atomic(path, content)
+            status = 'changed'
+    return html_path, status
+
+
+def list_cached_acts(states=None):
+    for state_dir in iter_state_dirs(WebsiteDir, states):
+        for act_info in load_act_infos(state_dir):
+            act_web_number = get_act_web_number(act_info['View'])
+            act_dir = state_dir / act_web_number
+            html_path = act_dir / f'{act_web_number}.html'
+            if html_path.exists():
+                yield act_info['View'], html_path, act_dir / f'{act_web_number}.json'
+
+
+def main():
+    states = sys.argv[1:]
+    acts = list(list_cached_acts(states))
+    print(f'Reparsing {len(acts)} acts')
+
+    counts = {'changed': 0, 'unchanged': 0, 'failed': 0}
+    with Pool() as pool:
+        for html_path, status in pool.imap_unordered(reparse_act, acts, chunksize=16):
+            if status.startswith('failed'):
+                print(f'{html_path}: {status}')
+                counts['failed'] += 1
+            else:
+                counts[status] += 1
+    print(', '.join(f'{k}: {v}' for k, v in counts.items()))
+
+
+if __name__ == '__main__':
+    main()
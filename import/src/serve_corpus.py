@@ -0,0 +1,273 @@
+"""
+Local read-only HTTP/JSON API over the crawled corpus.
+
+Endpoints (list endpoints take ?page=&per_page=):
+    GET /states
+    GET /states/<state>/acts?updated_after=YYYY-MM-DD&enacted_after=YYYY-MM-DD
+    GET /acts/<state>/<web_number>
+    GET /acts/<state>/<web_number>/sections
+    GET /acts/<state>/<web_number>/sections/<section_web_number>
+
+Act metadata comes from a precomputed index (api_index.json, built by the
+'index' command, or at startup if it is missing). Acts of each state are kept
+sorted by last updated date, so 'updated after' is a bisect. Responses are
+cached in an in-process LRU, carry an ETag (304 on If-None-Match) and are
+gzipped when the client accepts it. The cache lives as long as the process,
+so restart the server after a crawl.
+
+Usage:
+    python serve_corpus.py index
+    python serve_corpus.py [port]
+"""
+
+import gzip
+import hashlib
+import json
+import sys
+from bisect import bisect_right
+from datetime import datetime
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs, unquote
+
+from corpus import WebsiteDir, get_act_web_number, iter_state_dirs, load_act_infos, write_text_atomic
+from normalize_html import load_section_fragment
+
+IndexPath = Path("import/api_index.json")
+Port = 8000
+PerPage = 50
+MaxPerPage = 500
+CacheSize = 4096
+MinGzipSize = 512
+
+
+class APIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_date(date_str, formats=('%d %B %Y', '%d-%b-%Y', '%Y-%m-%d')):
+    """Return an ISO date for the date formats used in the corpus, None if it does not parse."""
+    for date_format in formats:
+        try:
+            return datetime.strptime(date_str.strip(), date_format).date().isoformat()
+        except (ValueError, AttributeError):
+            continue
+    return None
+
+
+def parse_query_date(name, value):
+    """ISO date of a date query parameter, a malformed value is a 400 rather than an empty result."""
+    iso_date = parse_date(value)
+    if iso_date is None:
+        raise APIError(400, f'{name} must be a date like 2020-01-31, got {value!r}')
+    return iso_date
+
+
+def build_index(website_dir: Path = WebsiteDir):
+    """Act summaries per state, sorted by last updated date (acts without one first)."""
+    index = {}
+    for state_dir in iter_state_dirs(website_dir):
+        acts = []
+        for act_info in load_act_infos(state_dir):
+            web_number = get_act_web_number(act_info['View'])
+            act_dir = state_dir / web_number
+            act_json_path = act_dir / f'{web_number}.json'
+            act_json = json.loads(act_json_path.read_text()) if act_json_path.exists() else {}
+
+            last_updated_date = None
+            last_updated_path = act_dir / 'citation_pdf' / 'last_updated_date.json'
+            if last_updated_path.exists():
+                try:
+                    last_updated_date = json.loads(last_updated_path.read_text()).get('last_updated_date')
+                except ValueError:
+                    pass
+
+            acts.append({
+                'web_number': web_number,
+                'short_title': act_info.get('Short Title'),
+                'act_number': act_info.get('Act Number'),
+                'enactment_date': act_info.get('Enactment Date'),
+                'enactment_iso_date': parse_date(act_info.get('Enactment Date')),
+                'last_updated_date': last_updated_date,
+                'last_updated_iso_date': parse_date(last_updated_date),
+                'num_sections': len(act_json.get('sections', [])),
+                'url': act_info['View'],
+            })
+        acts.sort(key=lambda a: (a['last_updated_iso_date'] or '', a['web_number']))
+        index[state_dir.name] = acts
+    return index
+
+
+class Corpus:
+    def __init__(self, index, website_dir: Path = WebsiteDir):
+        self.website_dir = website_dir
+        self.index = index
+        self.acts = {(state, act['web_number']): act for state, acts in index.items() for act in acts}
+        self.updated_dates = {
+            state: [act['last_updated_iso_date'] or '' for act in acts] for state, acts in index.items()
+        }
+
+    @lru_cache(maxsize=CacheSize)
+    def load_act_json(self, state, web_number):
+        if (state, web_number) not in self.acts:
+            raise APIError(404, f'Unknown act {state}/{web_number}')
+        act_json_path = self.website_dir / state / web_number / f'{web_number}.json'
+        if not act_json_path.exists():
+            raise APIError(404, f'Act {state}/{web_number} is not parsed yet')
+        return json.loads(act_json_path.read_text())
+
+    def get_states(self):
+        return [{'state': state, 'num_acts': len(acts)} for state, acts in self.index.items()]
+
+    def get_acts(self, state, updated_after=None, enacted_after=None):
+        if state not in self.index:
+            raise APIError(404, f'Unknown state {state}')
+        acts = self.index[state]
+        if updated_after:
+            acts = acts[bisect_right(self.updated_dates[state], parse_query_date('updated_after', updated_after)):]
+        if enacted_after:
+            enacted_after = parse_query_date('enacted_after', enacted_after)
+            acts = [a for a in acts if (a['enactment_iso_date'] or '') > enacted_after]
+        return acts
+
+    def get_act(self, state, web_number):
+        return dict(self.load_act_json(state, web_number), summary=self.acts[(state, web_number)])
+
+    def get_sections(self, state, web_number):
+        return self.load_act_json(state, web_number).get('sections', [])
+
+    def get_section(self, state, web_number, section_web_number):
+        sections = {s['web_number']: s for s in self.get_sections(state, web_number)}
+        if section_web_number not in sections:
+            raise APIError(404, f'Unknown section {state}/{web_number}/{section_web_number}')
+        section_dir = self.website_dir / state / web_number / 'sections'
+        section_path = section_dir / f'{section_web_number}.html'
+        notification_path = section_dir / f'{section_web_number}_notification.html'
+        return dict(
+            sections[section_web_number],
+            fragment=load_section_fragment(section_path) if section_path.exists() else None,
+            notification=load_section_fragment(notification_path) if notification_path.exists() else None,
+        )
+
+
+def paginate(items, query):
+    try:
+        page = max(1, int(query.get('page', 1)))
+        per_page = min(MaxPerPage, max(1, int(query.get('per_page', PerPage))))
+    except ValueError:
+        raise APIError(400, 'page and per_page must be integers')
+    start = (page - 1) * per_page
+    return {
+        'total': len(items),
+        'page': page,
+        'per_page': per_page,
+        'next_page': page + 1 if start + per_page < len(items) else None,
+        'items': items[start:start + per_page],
+    }
+
+
+def route(corpus: Corpus, path, query):
+    """Return the JSON-serializable body for a request path."""
+    parts = [unquote(p) for p in path.strip('/').split('/') if p]
+    if parts == ['states']:
+        return corpus.get_states()
+    if len(parts) == 3 and parts[0] == 'states' and parts[2] == 'acts':
+        acts = corpus.get_acts(parts[1], query.get('updated_after'), query.get('enacted_after'))
+        return paginate(acts, query)
+    if len(parts) >= 3 and parts[0] == 'acts':
+        state, web_number = parts[1], parts[2]
+        if len(parts) == 3:
+            return corpus.get_act(state, web_number)
+        if len(parts) == 4 and parts[3] == 'sections':
+            return paginate(corpus.get_sections(state, web_number), query)
+        if len(parts) == 5 and parts[3] == 'sections':
+            return corpus.get_section(state, web_number, parts[4])
+    raise APIError(404, f'Unknown path {path}')
+
+
+def make_response_cache(corpus: Corpus):
+    @lru_cache(maxsize=CacheSize)
+    def get_response(path, query_str):
+        """Return (status, body, gzipped body, etag) for a request, cached by path and query."""
+        query = {k: v[-1] for k, v in parse_qs(query_str).items()}
+        try:
+            status, payload = 200, route(corpus, path, query)
+        except APIError as e:
+            status, payload = e.status, {'error': str(e)}
+        body = json.dumps(payload).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        gzipped = gzip.compress(body, compresslevel=5) if len(body) >= MinGzipSize else None
+        return status, body, gzipped, etag
+
+    return get_response
+
+
+class CorpusHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True  # otherwise keep-alive responses wait on the client's delayed ACK
+    get_response = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        status, body, gzipped, etag = self.get_response(url.path, url.query)
+        use_gzip = gzipped is not None and 'gzip' in self.headers.get('Accept-Encoding', '')
+        if use_gzip:
+            # a strong ETag identifies the exact bytes, so the gzip variant gets its own
+            etag = etag[:-1] + '-gz"'
+
+        if status == 200 and etag in self.headers.get('If-None-Match', ''):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if use_gzip:
+            body = gzipped
+            self.send_response(status)
+            self.send_header('Content-Encoding', 'gzip')
+        else:
+            self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def load_index(index_path: Path = IndexPath):
+    if index_path.exists():
+        return json.loads(index_path.read_text())
+    index = build_index()
+    write_text_atomic(index_path, json.dumps(index))
+    return index
+
+
+def make_server(port=Port, index=None):
+    corpus = Corpus(index if index is not None else load_index())
+    handler = type('Handler', (CorpusHandler,), {'get_response': staticmethod(make_response_cache(corpus))})
+    return ThreadingHTTPServer(('127.0.0.1', port), handler)
+
+
+def main():
+    if sys.argv[1:] == ['index']:
+        index = build_index()
+        write_text_atomic(IndexPath, json.dumps(index))
+        print(f'Indexed {sum(len(acts) for acts in index.values())} acts in {len(index)} states to {IndexPath}')
+        return
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else Port
+    server = make_server(port)
+    print(f'Serving corpus on http://127.0.0.1:{port}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
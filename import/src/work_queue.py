@@ -0,0 +1,407 @@
+"""
+Lease-based work queue for crawling with several workers, on one or more hosts.
+
+Tasks are acts, chapter pages, sections, notifications and PDFs. A worker leases a task for
+LeaseSeconds and heartbeats while it works; if it crashes the lease expires and
+another worker picks the task up. Completing a task is idempotent, and since
+every fetch_* writes atomically a task that runs twice just finds its output
+already cached. Fetching an act enqueues its chapter pages, sections,
+notifications and PDFs. Once all chapter pages of an act are cached, the act's
+JSON and section structure are rebuilt from the cache.
+
+All workers draw from one global token bucket stored next to the tasks, so
+adding workers or hosts never exceeds the request rate indiacode tolerates.
+
+The default backend is SQLite on a shared filesystem. Other backends implement
+WorkQueue and are registered in Backends.
+
+Usage:
+    python work_queue.py <queue.db> enqueue <act_infos.json> ...
+    python work_queue.py <queue.db> work [worker_id]
+    python work_queue.py <queue.db> rate <requests_per_second>
+    python work_queue.py <queue.db> stats
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from corpus import WebsiteDir, get_act_web_number, citation_pdf_path, act_pdf_path
+from act_structure import list_chapter_pages, get_chapter_url, get_heading_label
+
+LeaseSeconds = 300
+MaxAttempts = 5
+RequestsPerSecond = 0.5  # fetch_page_curl() sleeps 2 seconds between requests
+
+
+class Task(BaseModel):
+    task_id: str
+    kind: str
+    payload: dict
+    attempts: int = 0
+
+
+class WorkQueue(ABC):
+    """Interface of a work queue backend."""
+
+    @abstractmethod
+    def add(self, tasks: List[Task]):
+        """Enqueue tasks, tasks that already exist (in any state) are left alone."""
+
+    @abstractmethod
+    def lease(self, worker_id, lease_seconds=LeaseSeconds) -> Optional[Task]:
+        """Lease the next pending or expired task to `worker_id`, None if there is nothing to do."""
+
+    @abstractmethod
+    def heartbeat(self, task_id, worker_id, lease_seconds=LeaseSeconds) -> bool:
+        """Extend the lease, returns False if the worker no longer holds it."""
+
+    @abstractmethod
+    def complete(self, task_id, worker_id) -> bool:
+        """Mark the task done, returns False if it was already done."""
+
+    @abstractmethod
+    def fail(self, task_id, worker_id, error):
+        """Release the task for a retry, or give up on it after MaxAttempts."""
+
+    @abstractmethod
+    def acquire_request(self):
+        """Block until the global rate budget allows one more request to indiacode."""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Task counts by kind and status."""
+
+
+class SQLiteWorkQueue(WorkQueue):
+    def __init__(self, db_path, requests_per_second=None):
+        self.db_path = str(db_path)
+        with self._connect() as conn:
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS tasks (
+                    task_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker_id TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT
+                );
+                CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+                CREATE TABLE IF NOT EXISTS rate_budget (
+                    name TEXT PRIMARY KEY,
+                    requests_per_second REAL NOT NULL,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL
+                );
+            ''')
+            conn.execute(
+                'INSERT OR IGNORE INTO rate_budget VALUES (?, ?, ?, ?)',
+                ('indiacode', RequestsPerSecond, 1.0, time.time()),
+            )
+            if requests_per_second is not None:
+                conn.execute('UPDATE rate_budget SET requests_per_second = ?', (requests_per_second,))
+
+    @contextmanager
+    def _connect(self):
+        # isolation_level=None so that BEGIN IMMEDIATE below controls the write lock
+        conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def add(self, tasks):
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                'INSERT OR IGNORE INTO tasks (task_id, kind, payload) VALUES (?, ?, ?)',
+                [(t.task_id, t.kind, json.dumps(t.payload)) for t in tasks],
+            )
+            conn.execute('COMMIT')
+
+    def lease(self, worker_id, lease_seconds=LeaseSeconds):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                '''UPDATE tasks SET status = 'failed', error = 'lease expired'
+                   WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?''',
+                (now, MaxAttempts),
+            )
+            row = conn.execute(
+                '''SELECT task_id, kind, payload, attempts FROM tasks
+                   WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                   ORDER BY status = 'leased', rowid LIMIT 1''',
+                (now,),
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            task_id, kind, payload, attempts = row
+            conn.execute(
+                '''UPDATE tasks SET status = 'leased', worker_id = ?, lease_expires = ?, attempts = attempts + 1
+                   WHERE task_id = ?''',
+                (worker_id, now + lease_seconds, task_id),
+            )
+            conn.execute('COMMIT')
+        return Task(task_id=task_id, kind=kind, payload=json.loads(payload), attempts=attempts + 1)
+
+    def heartbeat(self, task_id, worker_id, lease_seconds=LeaseSeconds):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                '''UPDATE tasks SET lease_expires = ?
+                   WHERE task_id = ? AND worker_id = ? AND status = 'leased' ''',
+                (time.time() + lease_seconds, task_id, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, task_id, worker_id):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'done', worker_id = ?, lease_expires = NULL WHERE task_id = ? AND status != 'done'",
+                (worker_id, task_id),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, task_id, worker_id, error):
+        with self._connect() as conn:
+            conn.execute(
+                '''UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                       lease_expires = NULL, error = ?
+                   WHERE task_id = ? AND worker_id = ? AND status = 'leased' ''',
+                (MaxAttempts, str(error), task_id, worker_id),
+            )
+
+    def acquire_request(self):
+        while True:
+            with self._connect() as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                rate, tokens, updated = conn.execute(
+                    "SELECT requests_per_second, tokens, updated FROM rate_budget WHERE name = 'indiacode'"
+                ).fetchone()
+                now = time.time()
+                tokens = min(1.0, tokens + (now - updated) * rate)
+                granted = tokens >= 1.0
+                if granted:
+                    tokens -= 1.0
+                conn.execute(
+                    "UPDATE rate_budget SET tokens = ?, updated = ? WHERE name = 'indiacode'", (tokens, now)
+                )
+                conn.execute('COMMIT')
+            if granted:
+                return
+            time.sleep((1.0 - tokens) / rate)
+
+    def stats(self):
+        with self._connect() as conn:
+            rows = conn.execute('SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status').fetchall()
+        stats = {}
+        for kind, status, count in rows:
+            stats.setdefault(kind, {})[status] = count
+        return stats
+
+
+Backends = {'sqlite': SQLiteWorkQueue}
+
+
+def open_queue(queue_path, backend='sqlite', **kwargs) -> WorkQueue:
+    return Backends[backend](queue_path, **kwargs)
+
+
+def act_task(state, act_info):
+    act_web_number = get_act_web_number(act_info['View'])
+    return Task(
+        task_id=f'act:{state}/{act_web_number}',
+        kind='act',
+        payload={'state': state, 'act_web_number': act_web_number, 'url': act_info['View']},
+    )
+
+
+def get_child_tasks(state, act_details):
+    """Chapter, section, notification and PDF tasks of a fetched act, skipping files that are already cached."""
+    act_dir = WebsiteDir / state / act_details.web_number
+    section_dir = act_dir / 'sections'
+    key = f'{state}/{act_details.web_number}'
+    payload = {'state': state, 'act_web_number': act_details.web_number, 'web_act_id': act_details.web_act_id}
+
+    tasks = []
+    if act_details.sections:
+        for chapter, heading, page_path in list_chapter_pages(act_dir):
+            if not page_path.exists():
+                chapter_payload = dict(
+                    payload, act_url=act_details.url, url=get_chapter_url(act_details, heading),
+                    path=str(page_path), label=get_heading_label(chapter, heading),
+                )
+                tasks.append(Task(task_id=f'chapter:{key}/{page_path.stem}', kind='chapter', payload=chapter_payload))
+
+    for section_info in act_details.sections:
+        section_payload = dict(payload, section=section_info.model_dump())
+        if not (section_dir / f'{section_info.web_number}.html').exists():
+            tasks.append(Task(task_id=f'section:{key}/{section_info.web_number}', kind='section', payload=section_payload))
+        notification_path = section_dir / f'{section_info.web_number}_notification.html'
+        if section_info.has_notification and not notification_path.exists():
+            tasks.append(Task(task_id=f'notification:{key}/{section_info.web_number}', kind='notification', payload=section_payload))
+
+    pdfs = [('citation', url, citation_pdf_path(act_dir, url)) for url in act_details.citation_pdf_urls[:1]]
+    pdfs += [('other', url.replace('nic.in ', 'nic.in'), act_pdf_path(act_dir, url)) for url in act_details.pdf_urls]
+    for pdf_kind, url, pdf_path in pdfs:
+        if not pdf_path.exists():
+            pdf_payload = dict(payload, pdf_kind=pdf_kind, url=url, path=str(pdf_path), has_sections=bool(act_details.sections))
+            tasks.append(Task(task_id=f'pdf:{pdf_path}', kind='pdf', payload=pdf_payload))
+    return tasks
+
+
+def run_task(queue: WorkQueue, task: Task):
+    """Execute a task with the fetch_acts functions, returns True on success."""
+    import fetch_acts
+
+    payload = task.payload
+    state_dir = WebsiteDir / payload['state']
+    act_dir = state_dir / payload['act_web_number']
+
+    # a rate token is taken only right before a request, cached files cost nothing
+    if task.kind == 'act':
+        if not (act_dir / f'{payload["act_web_number"]}.html').exists():
+            queue.acquire_request()
+        act_details = fetch_acts.fetch_act(payload['url'], payload['act_web_number'], state_dir)
+        if act_details is None:
+            return False
+        queue.add(get_child_tasks(payload['state'], act_details))
+        return True
+
+    if task.kind == 'chapter':
+        page_path = Path(payload['path'])
+        if not page_path.exists():
+            queue.acquire_request()
+            if not fetch_acts.fetch_chapter_page(payload['url'], page_path, payload['label']):
+                return False
+        # each task checks after its own write, so whichever lands last sees every page
+        if all(path.exists() for _, _, path in list_chapter_pages(act_dir)):
+            fetch_acts.fetch_act(payload['act_url'], payload['act_web_number'], state_dir)
+        return True
+
+    if task.kind in ('section', 'notification'):
+        section_info = fetch_acts.SectionInfo(**payload['section'])
+        section_dir = act_dir / 'sections'
+        section_dir.mkdir(exist_ok=True, parents=True)
+        if task.kind == 'section':
+            if not (section_dir / f'{section_info.web_number}.html').exists():
+                queue.acquire_request()
+            # notifications are separate tasks, so fetch only the section here
+            section_info = section_info.model_copy(update={'has_notification': False})
+            return fetch_acts.fetch_section(payload['web_act_id'], section_info, section_dir) is not None
+        if (section_dir / f'{section_info.web_number}_notification.html').exists():
+            return True
+        queue.acquire_request()
+        return fetch_acts.fetch_notification(payload['web_act_id'], section_info, section_dir)
+
+    if task.kind == 'pdf':
+        pdf_path = Path(payload['path'])
+        if not pdf_path.exists():
+            queue.acquire_request()
+            if not fetch_acts.fetch_pdf(payload['url'], pdf_path):
+                return False
+        if payload['pdf_kind'] == 'citation' and payload['has_sections']:
+            fetch_acts.save_last_updated_date(pdf_path, payload['url'])
+        return True
+
+    raise ValueError(f'Unknown task kind: {task.kind}')
+
+
+class Heartbeat(threading.Thread):
+    """Keep extending the lease of a task while it runs."""
+
+    def __init__(self, queue: WorkQueue, task_id, worker_id, lease_seconds=LeaseSeconds):
+        super().__init__(daemon=True)
+        self.queue, self.task_id, self.worker_id, self.lease_seconds = queue, task_id, worker_id, lease_seconds
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.lease_seconds / 3):
+            if not self.queue.heartbeat(self.task_id, self.worker_id, self.lease_seconds):
+                print(f'\tLost lease on {self.task_id}')
+                return
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def work(queue: WorkQueue, worker_id, idle_exit=True, poll_seconds=30):
+    """Lease and run tasks until the queue is drained."""
+    num_done = 0
+    while True:
+        task = queue.lease(worker_id)
+        if task is None:
+            if idle_exit:
+                break
+            time.sleep(poll_seconds)
+            continue
+
+        print(f'[{worker_id}] {task.task_id} (attempt {task.attempts})')
+        heartbeat = Heartbeat(queue, task.task_id, worker_id)
+        heartbeat.start()
+        try:
+            ok = run_task(queue, task)
+        except Exception as e:
+            ok, error = False, e
+        else:
+            error = 'fetch failed'
+        finally:
+            heartbeat.stop()
+
+        if ok:
+            queue.complete(task.task_id, worker_id)
+            num_done += 1
+        else:
+            print(f'\t{task.task_id} failed: {error}')
+            queue.fail(task.task_id, worker_id, error)
+
+    print(f'[{worker_id}] queue drained, completed {num_done} tasks')
+    try:
+        import fetch_acts
+        fetch_acts.close_browser()
+    except ImportError:
+        pass
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    queue_path, command, args = Path(sys.argv[1]), sys.argv[2], sys.argv[3:]
+
+    if command == 'rate':
+        open_queue(queue_path, requests_per_second=float(args[0]))
+    elif command == 'enqueue':
+        queue = open_queue(queue_path)
+        for act_infos_file in args:
+            act_infos_file = Path(act_infos_file)
+            state = act_infos_file.parent.name
+            tasks = [act_task(state, act_info) for act_info in json.loads(act_infos_file.read_text())]
+            queue.add(tasks)
+            print(f'{state}: enqueued {len(tasks)} acts')
+    elif command == 'work':
+        worker_id = args[0] if args else f'{socket.gethostname()}-{os.getpid()}'
+        work(open_queue(queue_path), worker_id)
+    elif command == 'stats':
+        print(json.dumps(open_queue(queue_path).stats(), indent=2))
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()